@@ -2,27 +2,71 @@
 Minimal AI chatbot you can run locally.
 
 What you get in ONE file:
-- A Flask backend with a /api/chat endpoint calling OpenAI's Responses API
-- Serves a tiny HTML+JS chat UI at /
-- Stateless by default: the browser sends the whole chat history each turn
+- A Quart (async Flask) backend with a /api/chat endpoint calling OpenAI's Responses API
+- A /api/chat/stream variant that streams the reply as Server-Sent Events
+- Serves a tiny HTML+JS chat UI at / (renders replies as they stream in)
+- Conversation state lives with OpenAI: after the first turn the browser sends
+  only the new message plus the previous reply's response_id (clients that
+  resend the whole history without one still work)
 
 How to run:
 1) Python 3.9+
 2) pip install -r requirements (see bottom of this file)
 3) Set env var:  export OPENAI_API_KEY=sk-...  (Windows: set OPENAI_API_KEY=...)
-4) python app.py  → open http://127.0.0.1:5000
+4) python NewAiChatBot.py  → open http://127.0.0.1:5000  (dev server;
+   set QUART_DEBUG=1 for the debugger and auto-reloader)
+
+Production: each /api/chat waits seconds on OpenAI. The handler is async, so a
+single hypercorn worker keeps many chats in flight on one event loop:
+    hypercorn -w 1 -b 0.0.0.0:5000 NewAiChatBot:app
 
 NOTE: Uses the OpenAI Python SDK (Responses API) and the `gpt-4o-mini` model.
 """
 
 import os
-import json
+import gzip
+import hashlib
 from textwrap import dedent
-from flask import Flask, request, jsonify, Response
-from openai import OpenAI
+from typing import Annotated, Optional, TypedDict
+import brotli
+import httpx
+import msgspec
+import orjson
+from cachetools import TTLCache
+from quart import Quart, request, jsonify, Response
+from quart.json.provider import DefaultJSONProvider
+from openai import AsyncOpenAI
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Route every jsonify/get_json in the app, error bodies included, through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+app = Quart(__name__)
+app.json = ORJSONProvider(app)
 
-app = Flask(__name__)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Concurrent chats multiplex over one pooled HTTP/2 connection to OpenAI
+# instead of each paying its own TLS handshake.
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    ),
+)
+# /api/chat gets no bytes until the whole reply is ready, so the 30 s read timeout
+# (fine for SSE, where tokens keep arriving) is too short there. Retries are off
+# so a slow generation that times out is not re-run and billed again.
+blocking_client = client.with_options(
+    timeout=httpx.Timeout(120.0, connect=5.0), max_retries=0
+)
 
 SYSTEM_PROMPT = (
     "You are a helpful and polite hospital helpline assistant. "
@@ -33,29 +77,90 @@ SYSTEM_PROMPT = (
     "Always remind users that you are not a doctor and cannot give "
     "professional medical advice."
 )
+_SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# (reply, response_id) keyed by a hash of the model input and the response it
+# continues, so repeated prompts like greetings and FAQs skip the OpenAI round-trip.
+_REPLY_CACHE = TTLCache(maxsize=10_000, ttl=3600)
+
+
+class ChatMessage(TypedDict):
+    role: str
+    content: str
+
+
+class ChatRequest(msgspec.Struct):
+    """Body of /api/chat and /api/chat/stream. Decoding validates it in one pass
+    and yields plain {role, content} dicts, with any extra keys dropped. At least
+    one message is required, so an empty turn is a 400 rather than a model call."""
+
+    messages: Annotated[list[ChatMessage], msgspec.Meta(min_length=1)]
+    previous_response_id: Optional[str] = None
+
+
+def _sse(payload):
+    """One Server-Sent Event whose data line is the JSON-encoded payload."""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _stream_error(event):
+    """Message for an "error", "response.failed" or "response.incomplete" stream event."""
+    if event.type == "error":
+        return event.message
+    response = event.response
+    if response.error:
+        return response.error.message
+    if response.incomplete_details:
+        return f"Response incomplete: {response.incomplete_details.reason}"
+    return f"Response {response.status}"
+
+
+def _build_input(messages, previous_response_id=None):
+    """Return the model input for this turn.
+
+    Without previous_response_id this is the system message followed by the full
+    history. With it, OpenAI already holds the system prompt and earlier turns
+    server-side, so only the client's new messages are uploaded. OpenAI still
+    processes and bills the whole chain as input tokens each turn.
+    """
+    if previous_response_id:
+        return messages
+    return [_SYSTEM_MSG, *messages]
+
+
+def _cache_key(previous_response_id, input_items):
+    return hashlib.blake2b(
+        orjson.dumps([previous_response_id, input_items]), digest_size=16
+    ).digest()
 
 
 @app.route("/api/chat", methods=["POST"])
-def chat_api():
-    """Accepts JSON: {"messages": [{role, content} ...]} and returns {"reply": str}.
-    The server is stateless; the client sends history each time.
+async def chat_api():
+    """Accepts JSON: {"messages": [{role, content} ...], "previous_response_id"?: str}
+    and returns {"reply": str, "response_id": str}.
+
+    Send the full history with no previous_response_id, or only the new turn
+    plus the response_id of the last reply to continue from OpenAI's stored state.
     """
     try:
-        data = request.get_json(force=True)
-        messages = data.get("messages", [])
-        if not isinstance(messages, list):
-            return jsonify({"error": "messages must be a list"}), 400
+        req = msgspec.json.decode(await request.get_data(), type=ChatRequest)
+    except msgspec.MsgspecError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Prepend/ensure a system message
-        history = [{"role": "system", "content": SYSTEM_PROMPT}] + [
-            {"role": m.get("role", "user"), "content": m.get("content", "")}
-            for m in messages
-        ]
+    try:
+        previous_id = req.previous_response_id
+        input_items = _build_input(req.messages, previous_id)
+        cache_key = _cache_key(previous_id, input_items)
+        cached = _REPLY_CACHE.get(cache_key)
+        if cached is not None:
+            reply_text, response_id = cached
+            return jsonify({"reply": reply_text, "response_id": response_id})
 
         # Responses API: send chat-style input; SDK merges outputs into .output_text
-        resp = client.responses.create(
+        resp = await blocking_client.responses.create(
             model="gpt-4o-mini",
-            input=history,
+            input=input_items,
+            previous_response_id=previous_id,
         )
 
         reply_text = getattr(resp, "output_text", "").strip()
@@ -63,121 +168,267 @@ def chat_api():
             # Fallback: dig into the structure if .output_text missing for some reason
             try:
                 first_item = resp.output[0]
-                reply_text = first_item.content[0].text
+                reply_text = first_item.content[0].text.strip()
             except Exception:
-                reply_text = "(No response text received.)"
+                return jsonify(
+                    {"reply": "(No response text received.)", "response_id": resp.id}
+                )
 
-        return jsonify({"reply": reply_text})
+        # Incomplete responses (e.g. a content-filter cut-off) still carry text;
+        # never replay a truncated or empty reply to later identical prompts.
+        if reply_text and resp.status == "completed":
+            _REPLY_CACHE[cache_key] = (reply_text, resp.id)
+        return jsonify({"reply": reply_text, "response_id": resp.id})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/")
-def index():
-    # A tiny chat UI with fetch(); no build tools needed.
-    html = dedent(
-        f"""
-        <!doctype html>
-        <html lang=\"en\">
-        <head>
-          <meta charset=\"utf-8\" />
-          <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
-          <title>Minimal AI Chatbot</title>
-          <style>
-            :root {{ font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; }}
-            body {{ margin: 0; background: #0b1020; color: #e6e9f2; }}
-            header {{ padding: 16px 20px; background: #0f1530; border-bottom: 1px solid #1f274a; }}
-            h1 {{ margin: 0; font-size: 18px; letter-spacing: .3px; }}
-            #app {{ max-width: 800px; margin: 0 auto; padding: 18px; }}
-            .bubble {{ padding: 12px 14px; border-radius: 14px; margin: 10px 0; line-height: 1.5; }}
-            .user {{ background: #1d2a55; align-self: flex-end; }}
-            .assistant {{ background: #161d3a; }}
-            .row {{ display: flex; gap: 10px; margin-top: 10px; }}
-            textarea {{ flex: 1; resize: vertical; min-height: 60px; max-height: 40vh; border-radius: 12px; padding: 10px; border: 1px solid #2a376b; background: #0f1530; color: #e6e9f2; }}
-            button {{ padding: 10px 14px; border-radius: 12px; border: 1px solid #2a376b; background: #1e2a58; color: #e6e9f2; cursor: pointer; }}
-            button:disabled {{ opacity: .6; cursor: not-allowed; }}
-            .messages {{ display: flex; flex-direction: column; }}
-            .hint {{ color: #aab3d9; font-size: 13px; margin: 6px 2px 14px; }}
-            .footer {{ opacity: .8; font-size: 12px; margin-top: 18px; }}
-            a {{ color: #9fc3ff; }}
-          </style>
-        </head>
-        <body>
-          <header><h1>🧠 Minimal AI Chatbot</h1></header>
-          <div id=\"app\">
-            <div class=\"hint\">Chat is stateless; page sends full history each message. Set <code>OPENAI_API_KEY</code> in your server env.</div>
-            <div id=\"messages\" class=\"messages\"></div>
-
-            <div class=\"row\">
-              <textarea id=\"input\" placeholder=\"Ask me anything...\"></textarea>
-              <button id=\"send\">Send</button>
-            </div>
-            <div class=\"footer\">Built with Flask + OpenAI Responses API.</div>
-          </div>
-          <script>
-            const messagesDiv = document.getElementById('messages');
-            const input = document.getElementById('input');
-            const sendBtn = document.getElementById('send');
-            /** in-memory history the server will receive each turn */
-            const history = [];
-
-            function addBubble(role, content) {{
-              const div = document.createElement('div');
-              div.className = 'bubble ' + (role === 'user' ? 'user' : 'assistant');
-              div.textContent = content;
-              messagesDiv.appendChild(div);
-              window.scrollTo(0, document.body.scrollHeight);
-            }}
-
-            async function send() {{
-              const text = input.value.trim();
-              if (!text) return;
-              input.value = '';
-              addBubble('user', text);
-              history.push({{ role: 'user', content: text }});
-              sendBtn.disabled = true; sendBtn.textContent = '...';
-              try {{
-                const res = await fetch('/api/chat', {{
-                  method: 'POST',
-                  headers: {{ 'Content-Type': 'application/json' }},
-                  body: JSON.stringify({{ messages: history }})
-                }});
-                const data = await res.json();
-                if (data.error) throw new Error(data.error);
-                const reply = data.reply || '(no reply)';
-                addBubble('assistant', reply);
-                history.push({{ role: 'assistant', content: reply }});
-              }} catch (err) {{
-                addBubble('assistant', '⚠️ ' + err.message);
-              }} finally {{
-                sendBtn.disabled = false; sendBtn.textContent = 'Send';
-              }}
-            }}
-
-            sendBtn.addEventListener('click', send);
-            input.addEventListener('keydown', (e) => {{
-              if ((e.metaKey || e.ctrlKey) && e.key === 'Enter') send();
-            }});
-          </script>
-        </body>
-        </html>
-        """
+@app.route("/api/chat/stream", methods=["POST"])
+async def chat_stream():
+    """Same input as /api/chat, but streams the reply as Server-Sent Events.
+    Each event is {"delta": str} and the last is {"response_id": str}; a failure
+    mid-stream arrives as {"error": str}.
+    """
+    try:
+        req = msgspec.json.decode(await request.get_data(), type=ChatRequest)
+    except msgspec.MsgspecError as e:
+        return jsonify({"error": str(e)}), 400
+
+    previous_id = req.previous_response_id
+    input_items = _build_input(req.messages, previous_id)
+    cache_key = _cache_key(previous_id, input_items)
+
+    async def events():
+        cached = _REPLY_CACHE.get(cache_key)
+        if cached is not None:
+            reply_text, response_id = cached
+            yield _sse({"delta": reply_text})
+            yield _sse({"response_id": response_id})
+            return
+
+        parts = []
+        completed = None
+        try:
+            async with client.responses.stream(
+                model="gpt-4o-mini",
+                input=input_items,
+                previous_response_id=previous_id,
+            ) as stream:
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        parts.append(event.delta)
+                        yield _sse({"delta": event.delta})
+                    elif event.type == "response.completed":
+                        completed = event.response
+                    elif event.type in ("error", "response.failed", "response.incomplete"):
+                        # The SDK does not raise on these; without this a cut-off
+                        # reply would look like a finished one to the browser.
+                        yield _sse({"error": _stream_error(event)})
+                        return
+        except Exception as e:
+            yield _sse({"error": str(e)})
+            return
+
+        if completed is None:
+            # No id to continue from; the client keeps its previous one.
+            yield _sse({"error": "Stream ended before the response completed."})
+            return
+
+        reply_text = "".join(parts).strip()
+        if reply_text:
+            _REPLY_CACHE[cache_key] = (reply_text, completed.id)
+        yield _sse({"response_id": completed.id})
+
+    response = Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return Response(html, mimetype="text/html")
+    # Quart's RESPONSE_TIMEOUT (60 s) would cut long generations off mid-stream
+    # with no error event; the httpx read timeout on the OpenAI client bounds
+    # each upstream wait instead.
+    response.timeout = None
+    return response
+
+
+# A tiny chat UI with fetch(); no build tools needed.
+# Rendered and encoded once at import so each GET / only ships cached bytes.
+_INDEX_HTML = dedent(
+    """
+    <!doctype html>
+    <html lang=\"en\">
+    <head>
+      <meta charset=\"utf-8\" />
+      <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
+      <title>Minimal AI Chatbot</title>
+      <style>
+        :root { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; }
+        body { margin: 0; background: #0b1020; color: #e6e9f2; }
+        header { padding: 16px 20px; background: #0f1530; border-bottom: 1px solid #1f274a; }
+        h1 { margin: 0; font-size: 18px; letter-spacing: .3px; }
+        #app { max-width: 800px; margin: 0 auto; padding: 18px; }
+        .bubble { padding: 12px 14px; border-radius: 14px; margin: 10px 0; line-height: 1.5; }
+        .user { background: #1d2a55; align-self: flex-end; }
+        .assistant { background: #161d3a; }
+        .row { display: flex; gap: 10px; margin-top: 10px; }
+        textarea { flex: 1; resize: vertical; min-height: 60px; max-height: 40vh; border-radius: 12px; padding: 10px; border: 1px solid #2a376b; background: #0f1530; color: #e6e9f2; }
+        button { padding: 10px 14px; border-radius: 12px; border: 1px solid #2a376b; background: #1e2a58; color: #e6e9f2; cursor: pointer; }
+        button:disabled { opacity: .6; cursor: not-allowed; }
+        .messages { display: flex; flex-direction: column; }
+        .hint { color: #aab3d9; font-size: 13px; margin: 6px 2px 14px; }
+        .footer { opacity: .8; font-size: 12px; margin-top: 18px; }
+        a { color: #9fc3ff; }
+      </style>
+    </head>
+    <body>
+      <header><h1>🧠 Minimal AI Chatbot</h1></header>
+      <div id=\"app\">
+        <div class=\"hint\">OpenAI keeps the conversation; page sends only each new message. Set <code>OPENAI_API_KEY</code> in your server env.</div>
+        <div id=\"messages\" class=\"messages\"></div>
+
+        <div class=\"row\">
+          <textarea id=\"input\" placeholder=\"Ask me anything...\"></textarea>
+          <button id=\"send\">Send</button>
+        </div>
+        <div class=\"footer\">Built with Quart + OpenAI Responses API.</div>
+      </div>
+      <script>
+        const messagesDiv = document.getElementById('messages');
+        const input = document.getElementById('input');
+        const sendBtn = document.getElementById('send');
+        /** id of the last reply; OpenAI continues the conversation from it */
+        let previousId = null;
+        /** local copy of the chat, resent in full if OpenAI rejects previousId */
+        const transcript = [];
+
+        function addBubble(role, content) {
+          const div = document.createElement('div');
+          div.className = 'bubble ' + (role === 'user' ? 'user' : 'assistant');
+          div.textContent = content;
+          messagesDiv.appendChild(div);
+          window.scrollTo(0, document.body.scrollHeight);
+          return div;
+        }
+
+        async function send() {
+          const text = input.value.trim();
+          if (!text) return;
+          input.value = '';
+          addBubble('user', text);
+          sendBtn.disabled = true; sendBtn.textContent = '...';
+          const bubble = addBubble('assistant', '');
+          const turn = { role: 'user', content: text };
+          try {
+            const res = await fetch('/api/chat/stream', {
+              method: 'POST',
+              headers: { 'Content-Type': 'application/json' },
+              body: JSON.stringify({
+                messages: previousId ? [turn] : [...transcript, turn],
+                previous_response_id: previousId
+              })
+            });
+            if (!res.ok) throw new Error((await res.json()).error || res.statusText);
+
+            // Read "data: {...}\\n\\n" events off the body as they arrive
+            const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buf = '', reply = '';
+            while (true) {
+              const { value, done } = await reader.read();
+              if (done) break;
+              buf += value;
+              let end;
+              while ((end = buf.indexOf('\\n\\n')) >= 0) {
+                const data = JSON.parse(buf.slice('data: '.length, end));
+                buf = buf.slice(end + 2);
+                if (data.error) throw new Error(data.error);
+                if ('response_id' in data) {
+                  // Never drop conversation state on a missing id
+                  if (data.response_id) previousId = data.response_id;
+                  continue;
+                }
+                reply += data.delta;
+                bubble.textContent = reply;
+                window.scrollTo(0, document.body.scrollHeight);
+              }
+            }
+            reply = reply.trim() || '(no reply)';
+            bubble.textContent = reply;
+            transcript.push(turn, { role: 'assistant', content: reply });
+          } catch (err) {
+            bubble.textContent = '⚠️ ' + err.message;
+            if (previousId) {
+              // The stored conversation may be gone; don't keep failing on it
+              previousId = null;
+              bubble.textContent += ' (Conversation state was reset; your next ' +
+                'message will resend the chat history.)';
+            }
+          } finally {
+            sendBtn.disabled = false; sendBtn.textContent = 'Send';
+          }
+        }
+
+        sendBtn.addEventListener('click', send);
+        input.addEventListener('keydown', (e) => {
+          if ((e.metaKey || e.ctrlKey) && e.key === 'Enter') send();
+        });
+      </script>
+    </body>
+    </html>
+    """
+)
+_INDEX_BYTES = _INDEX_HTML.encode("utf-8")
+
+
+def _index_variant(body, encoding=None):
+    """(etag, body, headers) for one encoding of the page; each gets its own ETag."""
+    etag = hashlib.md5(body).hexdigest()
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "public, max-age=3600",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return etag, body, headers
+
+
+# Compressed once here at max level; mtime=0 keeps the gzip ETag stable across restarts.
+_INDEX_VARIANTS = {
+    "br": _index_variant(brotli.compress(_INDEX_BYTES, quality=11), "br"),
+    "gzip": _index_variant(gzip.compress(_INDEX_BYTES, 9, mtime=0), "gzip"),
+    None: _index_variant(_INDEX_BYTES),
+}
+
+
+@app.route("/")
+async def index():
+    encoding = request.accept_encodings.best_match(("br", "gzip"))
+    etag, body, headers = _INDEX_VARIANTS[encoding]
+    if request.if_none_match.contains(etag):
+        return "", 304, headers
+    return Response(body, mimetype="text/html", headers=headers)
 
 
 if __name__ == "__main__":
-    # Simple dev server
+    # Simple dev server; use hypercorn for anything beyond local testing (see top)
     port = int(os.getenv("PORT", 5000))
     print(f"\n➡️  Open http://127.0.0.1:{port}\n")
-    app.run(host="0.0.0.0", port=port, debug=True)
+    # Debugger and reloader are opt-in: the reloader polls every module file
+    debug = os.getenv("QUART_DEBUG") == "1"
+    app.run(host="0.0.0.0", port=port, debug=debug, use_reloader=debug)
 
 
 # ------------------------------
 # requirements.txt (copy these lines into a file named requirements.txt)
 # ------------------------------
-# Flask==3.0.3
+# quart>=0.19
 # openai>=1.40.0
+# httpx[http2]>=0.27
+# orjson>=3.9
+# cachetools>=5.3
+# brotli>=1.1
+# msgspec>=0.18
+# hypercorn>=0.16
 
 